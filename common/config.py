@@ -1,5 +1,6 @@
-import yaml, glob
+import yaml, glob, threading, os, asyncio
 from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor
 from gsmmodem.modem import GsmModem
 from logger import logger
 import time
@@ -68,6 +69,13 @@ class AppConfig:
 
 port_files: dict | None = None
 yaml_config: AppConfig | None = None
+# 串口扫描锁：同一时间只允许一次扫描，避免并发重复打开同一串口
+port_scan_lock = threading.Lock()
+# 上次扫描完成的单调时钟时间；扫描结果为空时，间隔内不重复扫描
+port_scanned_at: float | None = None
+PORT_RESCAN_INTERVAL = 30.0
+# 每个串口独占一个单线程执行器：同一串口上的 AT 指令按提交顺序串行执行，也不占用默认线程池
+port_executors: dict[str, ThreadPoolExecutor] = {}
 
 class ConfigLoader:
     def __init__(self, config_path: str = "config.yaml"):
@@ -86,60 +94,111 @@ class ConfigLoader:
 
     @property
     def port_files(self) -> dict:
-        global port_files
+        global port_files, port_scanned_at
         if not port_files:
-            all_ports = sorted({port for patt in self.config.Port.Patterns for port in glob.glob(patt)})
-            logger.info_sync(f"扫描到了串口: {all_ports}")
-            def mapper(p):
-                try:
-                    modem = GsmModem(p, self.config.Port.BaudRate)
-                    modem.connect()
-                except Exception as e:
-                    return p, None
-                return p, modem
-            tmp_ports = {
-                port: {
+            if port_scanned_at is not None and time.monotonic() - port_scanned_at < PORT_RESCAN_INTERVAL:
+                # 刚扫描过且没有可用串口，短时间内不再重复打开所有串口
+                return port_files or {}
+            if not port_scan_lock.acquire(blocking=False):
+                # 已有扫描在进行中，直接返回当前结果，不阻塞调用方
+                return port_files or {}
+            try:
+                if not port_files:
+                    port_files = self.__scan_ports()
+            finally:
+                # 扫描抛异常时同样记录时间，否则每次调用都会重新打开所有串口
+                port_scanned_at = time.monotonic()
+                port_scan_lock.release()
+        return port_files
+
+    def __scan_ports(self) -> dict:
+        all_ports = sorted({port for patt in self.config.Port.Patterns for port in glob.glob(patt)})
+        logger.info_sync(f"扫描到了串口: {all_ports}")
+        def probe(p):
+            modem = None
+            try:
+                modem = GsmModem(p, self.config.Port.BaudRate)
+                modem.connect()
+                # 这些属性每次读取都会发一条 AT 指令，hasattr 再取值等于发两次，
+                # 这里统一用带默认值的 getattr，每个属性只读一次
+                imsi = getattr(modem, 'imsi', None)
+                if imsi is None:
+                    raise ValueError(f"{p} 无法读取 IMSI")
+                now = time.time()
+                return p, {
                     'modem': modem,
-                    'imsi': modem.imsi,
-                    'imei': modem.imei if hasattr(modem, 'imei') else "unknown",
-                    'signal': modem.signalStrength if hasattr(modem, 'signalStrength') else -1,
-                    'model': modem.model if hasattr(modem, 'model') else "Unknown",
+                    'imsi': imsi,
+                    'imei': getattr(modem, 'imei', "unknown"),
+                    'signal': getattr(modem, 'signalStrength', -1),
+                    'model': getattr(modem, 'model', "Unknown"),
+                    'network': getattr(modem, 'networkName', "Unknown"),
                     'status': 'healthy',
-                    'last_check': time.time(),
+                    'last_check': now,
                     'lock': False,
                     'error_count': 0,
                     'last_used': 0,
-                    'created_at': time.time()
-                } for port, modem in map(mapper, all_ports) if port and hasattr(modem, 'imsi')
-            }
-            # 按 imsi 去重
-            imsi_map: dict = {}
-            for port, info in tmp_ports.items():
-                imsi = info['imsi']
-                signal = info['signal']
-                if imsi not in imsi_map:
-                    imsi_map[imsi] = []
-                imsi_map[imsi].append((port, signal, info))
-            ports_to_remove = []
-            for imsi, port_list in imsi_map.items():
-                if len(port_list) > 1:
-                    port_list.sort(key=lambda x: x[1], reverse=True)
-                    for port, signal, info in port_list[1:]:
-                        try:
-                            info['modem'].close()
-                            ports_to_remove.append(port)
-                        except Exception as _:
-                            pass
-            for port in ports_to_remove:
-                if port in tmp_ports:
-                    del tmp_ports[port]
-            logger.info_sync(f"可用去重后串口: {tmp_ports.keys()}")
-            port_files = tmp_ports
-        return port_files
+                    'created_at': now
+                }
+            except Exception as e:
+                # 任一步失败都关闭已打开的串口，单个串口异常也不影响其他串口的并行探测
+                if modem is not None:
+                    try:
+                        modem.close()
+                    except Exception as _:
+                        pass
+                return p, None
+        # 各串口的连接与 AT 探测互不相关，并行执行，总耗时取决于最慢的串口
+        with ThreadPoolExecutor(max_workers=max(1, len(all_ports)), thread_name_prefix="port-scan") as pool:
+            tmp_ports = {port: info for port, info in pool.map(probe, all_ports) if info}
+        # 按 imsi 去重
+        imsi_map: dict = {}
+        for port, info in tmp_ports.items():
+            imsi = info['imsi']
+            signal = info['signal']
+            if imsi not in imsi_map:
+                imsi_map[imsi] = []
+            imsi_map[imsi].append((port, signal, info))
+        ports_to_remove = []
+        for imsi, port_list in imsi_map.items():
+            if len(port_list) > 1:
+                # 只需保留信号最强的一个，单次遍历取最大值即可，无需整体排序
+                best = max(port_list, key=lambda x: x[1])
+                for item in port_list:
+                    if item is best:
+                        continue
+                    port, signal, info = item
+                    try:
+                        info['modem'].close()
+                        ports_to_remove.append(port)
+                    except Exception as _:
+                        pass
+        for port in ports_to_remove:
+            if port in tmp_ports:
+                del tmp_ports[port]
+        # imsi 在 SIM 卡不变时是固定的，脱敏结果扫描时算一次即可
+        for info in tmp_ports.values():
+            imsi = info['imsi']
+            info['imsi_masked'] = imsi[:8] + '...' if isinstance(imsi, str) and len(imsi) > 8 else imsi
+        logger.info_sync(f"可用去重后串口: {tmp_ports.keys()}")
+        return tmp_ports
+
+    @property
+    def port_files_cached(self) -> dict:
+        """当前已扫描到的串口，不会触发扫描"""
+        return port_files or {}
 
-    def get_modem(self):
-        for port in self.port_files.keys():
-            if not self.port_files[port]['lock']:
+    @property
+    def all_unhealthy(self) -> bool:
+        """已扫描到串口但全部异常；与全部忙碌区分，异常的调制解调器不会再被归还可用"""
+        ports = self.port_files_cached
+        return bool(ports) and all(info['status'] != 'healthy' for info in ports.values())
+
+    def get_modem(self, scan: bool = True):
+        # scan=False 时只查缓存，供事件循环上调用，避免在循环线程里打开串口
+        ports = self.port_files if scan else self.port_files_cached
+        for port, info in ports.items():
+            # status 由发送路径在出错时维护，直接复用，不再把必然失败的调制解调器分配出去
+            if not info['lock'] and info['status'] == 'healthy':
                 return ModemWrapper(port)
         return None
 
@@ -197,49 +256,68 @@ class ConfigLoader:
         return configs
 
     def init_port(self):
-        import os
         for usb in self.config.Port.UsbVPid:
             os.system(f"usbreset {usb}")
-        global port_files
+        global port_files, port_scanned_at
         if port_files: port_files.clear()
+        port_scanned_at = None
 
 
 class ModemWrapper:
     def __init__(self, port):
         self.port = port
-        config = ConfigLoader()
-        config.port_files[port]["lock"] = True
+        # 持有选中串口的信息字典，后续操作不再经 ConfigLoader 重新查找
+        self.port_info = ConfigLoader().port_files[port]
+        self.port_info["lock"] = True
+        self.released = False
+
+    def release(self):
+        """归还调制解调器；可重复调用，只有第一次生效，避免清掉后续持有者的锁"""
+        if self.released:
+            return
+        self.released = True
+        self.port_info["lock"] = False
+        self.port_info["last_used"] = time.time()
 
     def __del__(self):
-        config = ConfigLoader()
-        config.port_files[self.port]["lock"] = False
-        config.port_files[self.port]["last_used"] = time.time()
+        # 兜底：调用方未显式归还时，对象回收时归还
+        self.release()
 
     @staticmethod
-    def try_new():
-        return ConfigLoader().get_modem()
+    def try_new(scan: bool = True):
+        return ConfigLoader().get_modem(scan)
 
     def get_info(self):
-        return ConfigLoader().port_files[self.port] | {"port": self.port}
+        return self.port_info | {"port": self.port}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        executor = port_executors.get(self.port)
+        if executor is None:
+            executor = port_executors[self.port] = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"modem-{self.port}",
+            )
+        return executor
 
-    def send_sms_sync(self, phone: str, message: str) -> dict:
+    def send_sms_sync(self, phone: str, message: str, message_id: str | None = None) -> dict:
         """
         同步发送短信
 
         Args:
             phone: 手机号码（国际格式，已校验）
             message: 短信内容
+            message_id: 调用方的消息 ID，用于日志关联；不传时随机生成
 
         Returns:
             dict: 发送结果
         """
-        import uuid
         start_time = time.time()
-        message_id = str(uuid.uuid4())[:8]
+        # 耗时用单调时钟计算，不受 NTP 校时跳变影响
+        start_clock = time.monotonic()
+        # 仅用于日志关联的短 ID，优先沿用调用方的 ID；否则直接取 4 字节随机数，省去 uuid 对象构造与格式化
+        message_id = message_id or os.urandom(4).hex()
 
-        # 获取当前配置
-        config = ConfigLoader()
-        port_info = config.port_files[self.port]
+        port_info = self.port_info
 
         result = {
             'message_id': message_id,
@@ -263,11 +341,13 @@ class ModemWrapper:
             if not modem:
                 raise Exception("调制解调器对象不存在")
 
-            # 记录发送信息
-            logger.info_sync(f"📤 [{message_id}] {self.port} -> {phone}...")
-            logger.info_sync(f"    内容长度: {len(message)} 字符")
-            logger.info_sync(f"    信号强度: {port_info.get('signal', -1)}")
-            logger.info_sync(f"    错误计数: {port_info.get('error_count', 0)}")
+            # 记录发送信息（合并为一条日志）
+            logger.info_sync(
+                f"📤 [{message_id}] {self.port} -> {phone}...\n"
+                f"    内容长度: {len(message)} 字符\n"
+                f"    信号强度: {port_info.get('signal', -1)}\n"
+                f"    错误计数: {port_info.get('error_count', 0)}"
+            )
 
             # 发送短信
             modem.sendSms(
@@ -279,8 +359,7 @@ class ModemWrapper:
             )
 
             # 更新状态
-            elapsed_time = time.time() - start_time
-            port_info['last_used'] = start_time
+            elapsed_time = time.monotonic() - start_clock
             port_info['error_count'] = max(0, port_info.get('error_count', 0) - 1)
 
             # 构建成功结果
@@ -288,19 +367,18 @@ class ModemWrapper:
                 'success': True,
                 'message': '短信发送成功',
                 'elapsed_time': round(elapsed_time, 2),
-                'imsi': port_info.get('imsi', 'unknown')[:8] + '...' if isinstance(port_info.get('imsi'), str) and len(
-                    port_info.get('imsi', '')) > 8 else port_info.get('imsi', 'unknown'),
+                'imsi': port_info.get('imsi_masked', 'unknown'),
                 'imei': port_info.get('imei', 'unknown'),
                 'signal': port_info.get('signal', -1),
                 'model': port_info.get('model', 'Unknown'),
-                'network': getattr(modem, 'networkName', 'Unknown') if hasattr(modem, 'networkName') else 'Unknown'
+                'network': port_info.get('network', 'Unknown')
             })
 
             logger.info_sync(f"✅ [{message_id}] 发送成功 ({elapsed_time:.2f}s)")
 
         except Exception as e:
             # 错误处理
-            elapsed_time = time.time() - start_time
+            elapsed_time = time.monotonic() - start_clock
             error_msg = str(e)
 
             # 更新错误计数
@@ -329,28 +407,27 @@ class ModemWrapper:
 
         return result
 
-    async def send_sms(self, phone: str, message: str) -> dict:
+    async def send_sms(self, phone: str, message: str, message_id: str | None = None) -> dict:
         """
         异步发送短信
 
         Args:
             phone: 手机号码（国际格式，已校验）
             message: 短信内容
+            message_id: 调用方的消息 ID，用于日志关联；不传时随机生成
 
         Returns:
             dict: 发送结果
         """
-        import asyncio
-
-        # 创建一个线程池来执行同步的发送操作
+        # 在该串口专属的执行器中执行同步的发送操作
         loop = asyncio.get_event_loop()
 
         def _sync_send():
-            return self.send_sms_sync(phone, message)
+            return self.send_sms_sync(phone, message, message_id)
 
         try:
-            # 使用线程池执行同步操作
-            result = await loop.run_in_executor(None, _sync_send)
+            # 使用串口专属执行器执行同步操作
+            result = await loop.run_in_executor(self.executor, _sync_send)
             return result
 
         except asyncio.CancelledError:
@@ -1,12 +1,16 @@
+import asyncio
 import json
 import time
 from typing import Any
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, fields
 import consul
 
 from logger import logger
 
-@dataclass
+# 复用同一个编码器：紧凑分隔符，中文按 UTF-8 原样输出而非 \uXXXX 转义
+_json_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+@dataclass(slots=True)
 class KVServiceMeta:
     ServerName: str
     ServerPath: str
@@ -17,7 +21,8 @@ class KVServiceMeta:
     updated_at: int  = field(default_factory=lambda: int(time.time()))
 
     def to_dict(self) -> dict:
-        return asdict(self)
+        # 浅拷贝即可：结果只用于序列化，不必像 asdict 那样深拷贝整个 ServerData
+        return {f.name: getattr(self, f.name) for f in fields(self)}
 
 class ConsulKVClient:
     def __init__(
@@ -43,7 +48,10 @@ class ConsulKVClient:
         value: Any,
     ) -> bool:
         full_key = f"{self.kv_base_path}{key}"
-        result = self.client.kv.put(full_key, json.dumps(value))
+        # python-consul 是同步 HTTP 客户端，放到线程池中执行，避免阻塞事件循环
+        result = await asyncio.get_event_loop().run_in_executor(
+            None, lambda: self.client.kv.put(full_key, _json_encode(value).encode("utf-8")),
+        )
 
         if result:
             await logger.info(f"✅ KV '{full_key}' 注册成功")
@@ -59,7 +67,9 @@ class ConsulKVClient:
     ) -> bool:
         try:
             full_key = f"{self.kv_base_path}{key}"
-            result = self.client.kv.delete(full_key, recurse=recurse)
+            result = await asyncio.get_event_loop().run_in_executor(
+                None, lambda: self.client.kv.delete(full_key, recurse=recurse),
+            )
 
             if result:
                 await logger.info(f"🗑️  KV '{full_key}' 注销成功")
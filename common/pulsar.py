@@ -38,6 +38,8 @@ class PulsarService:
         self.client = None
         self.consumer = None
         self.task = None
+        # 正在处理中的消息任务
+        self.inflight: set[asyncio.Task] = set()
 
     async def start(
             self,
@@ -45,7 +47,8 @@ class PulsarService:
             max_redelivery_count: int = 3,
             negative_ack_delay_ms: int = 90000,   # 负确认重试延迟
             ack_timeout_ms: int = 600000,         # ACK超时时间
-            receiver_queue_size: int = 1000
+            receiver_queue_size: int = 1000,
+            max_concurrency: int | Callable[[], int] = 1,
     ) -> asyncio.Task:
         """
         启动Pulsar监听服务
@@ -56,12 +59,20 @@ class PulsarService:
             negative_ack_delay_ms: 负确认后重试延迟（毫秒）
             ack_timeout_ms: ACK超时时间（毫秒）
             receiver_queue_size: 接收队列大小
+            max_concurrency: 同时处理的消息数上限（一般等于调制解调器数量）；
+                传入函数时每次拉取消息前重新读取，上限只增不减
         """
 
         self.max_redelivery_count = max_redelivery_count
 
+        # 先占用处理名额再拉取消息：满载时不再从 Pulsar 取消息，形成背压
+        concurrency_limit = max_concurrency if callable(max_concurrency) else (lambda: max_concurrency)
+        concurrency = max(1, concurrency_limit())
+        semaphore = asyncio.Semaphore(concurrency)
+
         async def _pulsar_listener() -> None:
             """Pulsar监听主函数"""
+            nonlocal concurrency
             try:
                 client_kwargs = {
                     "service_url": self.pulsar_url,
@@ -101,19 +112,36 @@ class PulsarService:
 
                 # 主监听循环
                 while True:
+                        # 启动后扫描到更多调制解调器时，补发相应数量的处理名额
+                        grown = concurrency_limit() - concurrency
+                        if grown > 0:
+                            concurrency += grown
+                            for _ in range(grown):
+                                semaphore.release()
+                            await logger.info(f"📈 {self.service_name} 并发上限调整为 {concurrency}")
+
+                        await semaphore.acquire()
+
                         msg = await asyncio.get_event_loop().run_in_executor(
                             None, lambda: self.consumer.receive(),
                         )
 
                         if msg is None:
+                            semaphore.release()
                             continue
 
-                        await self._process_message(msg, message_handler)
+                        task = asyncio.create_task(self._process_message(msg, message_handler))
+                        self.inflight.add(task)
+                        task.add_done_callback(self.inflight.discard)
+                        task.add_done_callback(lambda _: semaphore.release())
 
             except Exception as e:
                 await logger.error(f"💥 {self.service_name} 服务启动失败: {e}")
                 raise
             finally:
+                for task in self.inflight:
+                    task.cancel()
+                await asyncio.gather(*self.inflight, return_exceptions=True)
                 await self._cleanup()
 
         # 创建并启动任务
@@ -141,9 +169,10 @@ class PulsarService:
                 await self._negative_ack(msg)
                 return
 
-            # 解析JSON
+            # 解析JSON：msg.data() 每次调用都会复制一份消息体，只取一次；json.loads 直接接受 UTF-8 字节
             try:
-                payload = json.loads(msg.data().decode('utf-8')) if msg.data() else {}
+                data = msg.data()
+                payload = json.loads(data) if data else {}
             except json.JSONDecodeError as e:
                 await logger.error(f"📄 [{self.service_name}] JSON解析失败: {e}")
                 await self._negative_ack(msg)
@@ -27,17 +27,6 @@ async def main():
 
     await asyncio.sleep(15)
 
-    sms_service = PulsarService(
-        service_name="sms",
-        pulsar_url=config.config.Pulsar.Url,
-        main_topic=config.main_topic("sms"),
-        dlq_topic=config.dlq_topic,
-    )
-
-    await sms_service.start(
-        message_handler=sms_handler,
-    )
-
     consul = ConsulKVClient(
         host=config.config.Consul.Host,
         port=config.config.Consul.Port,
@@ -56,16 +45,35 @@ async def main():
         }}
     )
 
-    await consul.register_kv("sms", sms_schema.to_dict())
+    await logger.info(f"✉️ 开始扫描串口 ...")
+
+    # 串口扫描会打开串口并收发 AT 指令，放到线程池中执行，避免阻塞事件循环；
+    # 注册 KV 与扫描互不依赖，两者并发进行
+    port_files, _ = await asyncio.gather(
+        asyncio.get_event_loop().run_in_executor(None, lambda: config.port_files),
+        consul.register_kv("sms", sms_schema.to_dict()),
+    )
 
     await logger.info(f"📧 已注册 KV 到 Consul ...")
-    await logger.info("🎯 短信服务已启动，配置了自动重试和死信队列")
+    await logger.info(f"ℹ️ 发现 {len(port_files)} 个串口： {tuple(port_files.keys())}")
 
-    await logger.info(f"✉️ 开始扫描串口 ...")
+    sms_service = PulsarService(
+        service_name="sms",
+        pulsar_url=config.config.Pulsar.Url,
+        main_topic=config.main_topic("sms"),
+        dlq_topic=config.dlq_topic,
+    )
 
-    port_files = config.port_files
+    if not port_files:
+        await logger.warn("⚠️ 启动时未发现串口，消费者先以并发 1 启动，后续扫描发现调制解调器后自动放宽")
 
-    await logger.info(f"ℹ️ 发现 {len(port_files)} 个串口： {tuple(port_files.keys())}")
+    # 每个调制解调器同时处理一条消息；启动扫描可能早于调制解调器枚举完成，按当前已发现的串口数动态放宽
+    await sms_service.start(
+        message_handler=sms_handler,
+        max_concurrency=lambda: len(config.port_files_cached),
+    )
+
+    await logger.info("🎯 短信服务已启动，配置了自动重试和死信队列")
 
     try:
         await asyncio.gather(sms_service.task)
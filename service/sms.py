@@ -1,11 +1,12 @@
 import asyncio
+import re
 import time
 import uuid
 from dataclasses import dataclass, field
 from typing import Optional
 from datetime import datetime
 
-from common.config import ModemWrapper
+from common.config import ConfigLoader, ModemWrapper
 from logger import logger
 
 import threading
@@ -24,7 +25,7 @@ def setup_global_exception_handler():
 setup_global_exception_handler()
 
 
-@dataclass
+@dataclass(slots=True)
 class SMSMessage:
     phone: str
     content: str
@@ -32,13 +33,17 @@ class SMSMessage:
 
     @classmethod
     def from_dict(cls, json_data: dict) -> 'SMSMessage':
-        data = json_data.copy()
+        # 只挑出声明过的字段，不再复制整个消息体
+        data = {k: v for k, v in json_data.items() if k in cls.__annotations__}
         phone = data.get('phone', '').strip()
+        # 先按注册到 Consul 的 schema 校验号码，格式错误的消息不再占用调制解调器
+        if not _PHONE_RE.match(phone):
+            raise ValueError(f"手机号码格式错误: {phone}")
         if phone.startswith('+'):
             data['phone'] = phone
         else:
             data['phone'] = f"+86{phone}"
-        return cls(**{k: data[k] for k in data if k in cls.__annotations__})
+        return cls(**data)
 
 
 sms_field_description = {
@@ -68,9 +73,39 @@ sms_field_description = {
   "additionalProperties": True
 }
 
+# 与 schema 中的号码规则保持一致，模块加载时编译一次；
+# re.ASCII 让 \d 只匹配 0-9（与 JSON Schema 一致），全角数字不会被放行
+_PHONE_RE = re.compile(sms_field_description["properties"]["phone"]["pattern"], re.ASCII)
+
+# 调制解调器归还通知：发送任务释放调制解调器后唤醒等待者，不再固定睡眠轮询
+_modem_released = asyncio.Condition()
+
+
+async def _wait_for_release(timeout: float) -> Optional[ModemWrapper]:
+    """
+    等待其他任务归还调制解调器
+
+    Args:
+        timeout: 最长等待时间（秒）
+
+    Returns:
+        ModemWrapper or None
+    """
+    def _ready():
+        # 全部调制解调器异常时也唤醒，由调用方直接放弃，不再等满超时
+        return ModemWrapper.try_new(scan=False) or ConfigLoader().all_unhealthy
+
+    async with _modem_released:
+        try:
+            result = await asyncio.wait_for(_modem_released.wait_for(_ready), timeout)
+        except TimeoutError:
+            return None
+    return result if isinstance(result, ModemWrapper) else None
+
+
 async def _wait_for_modem(max_attempts: int = 5) -> Optional[ModemWrapper]:
     """
-    等待获取可用的调制解调器，使用指数退避策略
+    等待获取可用的调制解调器，按退避表限定每轮最长等待时间，有调制解调器归还时立即唤醒
 
     Args:
         max_attempts: 最大尝试次数
@@ -79,21 +114,33 @@ async def _wait_for_modem(max_attempts: int = 5) -> Optional[ModemWrapper]:
         ModemWrapper or None
     """
     wait_times = [60, 120, 120, 120, 165]  # 1, 2, 2, 2, 3分钟
+    loop = asyncio.get_event_loop()
 
     for attempt in range(max_attempts):
-        modem_wrapper = ModemWrapper.try_new()
+        if not ConfigLoader().port_files_cached:
+            # 缓存为空时读取 port_files 会重新扫描（打开串口并收发 AT 指令），放到线程池中执行
+            await loop.run_in_executor(None, lambda: ConfigLoader().port_files)
+        modem_wrapper = ModemWrapper.try_new(scan=False)
 
         if modem_wrapper:
             return modem_wrapper
 
+        if ConfigLoader().all_unhealthy:
+            # 没有状态恢复路径，等待也不会有可用的调制解调器，直接失败让消息尽快 nack
+            logger.error_sync("📱 所有调制解调器状态异常，放弃等待")
+            return None
+
         if attempt < len(wait_times):
             wait_time = wait_times[attempt]
             logger.warn_sync(f"📱 没有可用的调制解调器，第{attempt + 1}次等待 {wait_time}秒...")
-            await asyncio.sleep(wait_time)
         else:
-            default_wait = 60
-            logger.warn_sync(f"📱 等待超时，使用默认等待时间 {default_wait}秒...")
-            await asyncio.sleep(default_wait)
+            wait_time = 60
+            logger.warn_sync(f"📱 等待超时，使用默认等待时间 {wait_time}秒...")
+
+        modem_wrapper = await _wait_for_release(wait_time)
+
+        if modem_wrapper:
+            return modem_wrapper
 
     return None
 
@@ -109,10 +156,12 @@ def create_sms_task(sms_msg: SMSMessage) -> asyncio.Task[bool]:
         asyncio.Task[bool]: 短信发送任务本次是否成功
     """
 
+    message_id = uuid.uuid4()
+
     async def __send_sms() -> bool:
         """短信发送函数"""
-        start_time = time.time()
-        message_id = uuid.uuid4()
+        # 仅用于计算耗时，使用单调时钟；对外的时间戳仍取墙上时间
+        start_time = time.monotonic()
 
         result = {
             "success": False,
@@ -122,14 +171,16 @@ def create_sms_task(sms_msg: SMSMessage) -> asyncio.Task[bool]:
             "timestamp": datetime.now().isoformat(),
             "elapsed_time": 0.0,
             "attempts": 0,
-            "metadata": sms_msg.metadata.copy()
+            "metadata": sms_msg.metadata
         }
 
         try:
-            await logger.info(f"开始发送短信: {message_id}")
-            await logger.info(f"收件人: {sms_msg.phone}")
-            await logger.info(f"内容长度: {len(sms_msg.content)} 字符")
-            await logger.info(f"短信预览: {sms_msg.content[:15]} ... {sms_msg.content[-15:]}")
+            await logger.info(
+                f"开始发送短信: {message_id}\n"
+                f"收件人: {sms_msg.phone}\n"
+                f"内容长度: {len(sms_msg.content)} 字符\n"
+                f"短信预览: {sms_msg.content[:15]} ... {sms_msg.content[-15:]}"
+            )
 
             result["attempts"] += 1
             modem_wrapper = await _wait_for_modem()
@@ -138,7 +189,7 @@ def create_sms_task(sms_msg: SMSMessage) -> asyncio.Task[bool]:
                 error_msg = "获取调制解调器失败：所有调制解调器都在忙或不可用"
                 result["message"] = error_msg
                 result["error"] = "MODEM_BUSY"
-                result["elapsed_time"] = time.time() - start_time
+                result["elapsed_time"] = time.monotonic() - start_time
 
                 await logger.error(f"❌ 短信发送失败 {message_id}: {error_msg}")
                 return result["success"]
@@ -146,14 +197,16 @@ def create_sms_task(sms_msg: SMSMessage) -> asyncio.Task[bool]:
             modem_info = modem_wrapper.get_info()
             result["modem_info"] = {
                 "port": modem_info["port"],
-                "imsi": modem_info["imsi"][:8] + "..." if len(modem_info["imsi"]) > 8 else modem_info["imsi"],
+                "imsi": modem_info["imsi_masked"],
                 "signal": modem_info["signal"],
                 "model": modem_info["model"]
             }
 
-            await logger.trace(f"📱 使用调制解调器: {modem_info['port']}")
-            await logger.trace(f"  信号强度: {modem_info['signal']}")
-            await logger.trace(f"  设备型号: {modem_info['model']}")
+            await logger.trace(
+                f"📱 使用调制解调器: {modem_info['port']}\n"
+                f"  信号强度: {modem_info['signal']}\n"
+                f"  设备型号: {modem_info['model']}"
+            )
 
             # 短信附加元数据！
             if sms_msg.metadata:
@@ -173,7 +226,7 @@ def create_sms_task(sms_msg: SMSMessage) -> asyncio.Task[bool]:
                     ) + "\n\n".join(formatted_lines)
 
             # 发送短信
-            send_result = await modem_wrapper.send_sms(sms_msg.phone, sms_msg.content)
+            send_result = await modem_wrapper.send_sms(sms_msg.phone, sms_msg.content, str(message_id)[:8])
 
             # 合并结果
             for key, value in send_result.items():
@@ -181,13 +234,15 @@ def create_sms_task(sms_msg: SMSMessage) -> asyncio.Task[bool]:
                     result[key] = value
 
             # 记录最终结果
-            result["elapsed_time"] = time.time() - start_time
+            result["elapsed_time"] = time.monotonic() - start_time
 
             if send_result.get("success"):
                 result["success"] = True
                 result["message"] = "短信发送成功"
-                await logger.info(f"✅ 短信发送成功 {message_id}: {sms_msg.phone}")
-                await logger.info(f"  耗时: {result['elapsed_time']:.2f}秒")
+                await logger.info(
+                    f"✅ 短信发送成功 {message_id}: {sms_msg.phone}\n"
+                    f"  耗时: {result['elapsed_time']:.2f}秒"
+                )
             else:
                 result["success"] = False
                 result["message"] = send_result.get("error", "短信发送失败")
@@ -209,7 +264,7 @@ def create_sms_task(sms_msg: SMSMessage) -> asyncio.Task[bool]:
             result["success"] = False
             result["message"] = "短信发送任务被取消"
             result["error"] = "TASK_CANCELLED"
-            result["elapsed_time"] = time.time() - start_time
+            result["elapsed_time"] = time.monotonic() - start_time
 
             await logger.warn(f"⏹️ 短信发送任务取消 {message_id}: {sms_msg.phone}")
 
@@ -219,12 +274,18 @@ def create_sms_task(sms_msg: SMSMessage) -> asyncio.Task[bool]:
             result["message"] = f"短信发送异常: {str(e)}"
             result["error"] = "UNKNOWN_ERROR"
             result["error_detail"] = {"exception": str(e), "type": type(e).__name__, "traceback": traceback.format_exception(type(e), e, e.__traceback__)}
-            result["elapsed_time"] = time.time() - start_time
+            result["elapsed_time"] = time.monotonic() - start_time
             await logger.error(f"💥 短信发送异常 {message_id}: {result['error_detail']}")
 
         finally:
             if 'modem_wrapper' in locals():
+                # 显式归还：不能依赖 __del__，执行器中的任务可能还持有引用，回收时机不确定
+                if modem_wrapper:
+                    modem_wrapper.release()
                 del modem_wrapper
+                # 调制解调器已归还，唤醒等待中的发送任务
+                async with _modem_released:
+                    _modem_released.notify_all()
 
             # 记录最终状态
             result["completed_at"] = datetime.now().isoformat()
@@ -233,4 +294,4 @@ def create_sms_task(sms_msg: SMSMessage) -> asyncio.Task[bool]:
 
         return result["success"]
 
-    return asyncio.create_task(__send_sms(), name=f"sms-task-{uuid.uuid4()}")
+    return asyncio.create_task(__send_sms(), name=f"sms-task-{message_id}")